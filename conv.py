@@ -3,8 +3,26 @@ import re
 import os
 import html
 import argparse
+import logging
 import shutil
+import stat
+import sys
+import tempfile
 from collections import defaultdict
+from dataclasses import asdict, dataclass, is_dataclass
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# orjson is optional; it encodes considerably faster than the standard json module.
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 try:
     from lxml import etree
@@ -15,6 +33,107 @@ except ImportError:
     print("pip install lxml")
     exit(1)
 
+log = logging.getLogger(__name__)
+
+# XPath expressions are compiled once at import time and reused for every object.
+# smart_strings=False returns plain str results that do not keep their element alive.
+_XP_ATTACH_PAGE = etree.XPath(".//property[@name='content' or @name='container' or @name='containerContent']//id[@name='id']/text()", smart_strings=False)
+_XP_ATTACH_CREATOR = etree.XPath(".//property[@name='creator']/id[@name='key']/text()", smart_strings=False)
+_XP_ATTACH_PROPS = etree.XPath(".//collection[@name='contentProperties']/element/id[@name='id']/text()", smart_strings=False)
+_XP_CREATOR = etree.XPath("./property[@name='creator']/id[@name='key']/text()", smart_strings=False)
+_XP_MODIFIER = etree.XPath("./property[@name='lastModifier']/id[@name='key']/text()", smart_strings=False)
+_XP_BODY_REF = etree.XPath(".//collection[@name='bodyContents']/element/id[@name='id']/text()", smart_strings=False)
+_XP_PARENT = etree.XPath(".//collection[@name='parent']/ref/id[@name='id']/text()", smart_strings=False)
+_XP_LABELLINGS = etree.XPath(".//collection[@name='labellings']/object/ref[@name='label']/id/text()", smart_strings=False)
+
+# Matches any markup tag in Confluence storage format bodies.
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Number of bodies sent to a worker process per task when cleaning content in parallel.
+# Fewer bodies than this are cleaned in-process, where starting a pool would cost more than it saves.
+_CLEAN_CHUNK_SIZE = 64
+
+def _first_child_id(obj, name):
+    """
+    Returns the text of the first direct <id> child of obj with
+    the given name attribute, or None if there is no such id.
+    """
+    for child in obj.iterchildren('id'):
+        if child.get('name') == name:
+            return child.text
+    return None
+
+def _prop_text(obj, name):
+    """
+    Returns the text of the first direct <property> child of obj with
+    the given name attribute, or None if there is no such property.
+    """
+    for child in obj.iterchildren('property'):
+        if child.get('name') == name:
+            return child.text
+    return None
+
+# ioctl request number for FICLONE (Linux), which reflinks one file into another.
+_FICLONE = 0x40049409
+
+def _copy_file(source_path, dest_path, src_st=None):
+    """
+    Copies a file together with its permission bits and timestamps, like shutil.copy2.
+    On Linux the data is reflinked (FICLONE) when the filesystem supports it,
+    otherwise copied in-kernel with os.copy_file_range. Any other platform, or
+    any failure of the fast paths, falls back to shutil.copy2.
+    src_st may be passed in when the caller has already stat'ed the source.
+    """
+    if not hasattr(os, 'copy_file_range'):
+        shutil.copy2(source_path, dest_path)
+        return
+    try:
+        src_fd = os.open(source_path, os.O_RDONLY)
+        try:
+            dst_fd = os.open(dest_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                cloned = False
+                if fcntl is not None and sys.platform.startswith('linux'):
+                    try:
+                        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+                        cloned = True
+                    except OSError:
+                        pass
+                if src_st is None:
+                    src_st = os.fstat(src_fd)
+                if not cloned:
+                    remaining = src_st.st_size
+                    while remaining > 0:
+                        copied = os.copy_file_range(src_fd, dst_fd, remaining)
+                        if copied == 0:
+                            # Some filesystems report 0 instead of failing; never keep a short copy
+                            raise OSError(f"copy_file_range stopped with {remaining} bytes left")
+                        remaining -= copied
+                os.fchmod(dst_fd, stat.S_IMODE(src_st.st_mode))
+                os.utime(dst_fd, ns=(src_st.st_atime_ns, src_st.st_mtime_ns))
+            finally:
+                os.close(dst_fd)
+        finally:
+            os.close(src_fd)
+    except OSError:
+        shutil.copy2(source_path, dest_path)
+
+def _restore_attachment(source_path, src_st, dest_dir, dest_path, made_dirs):
+    """
+    Restores a single attachment file, creating its destination directory.
+    made_dirs is shared between calls and remembers the page directories that
+    already exist, so they are only created once.
+    """
+    page_dir = os.path.dirname(dest_dir)
+    if page_dir not in made_dirs:
+        os.makedirs(page_dir, exist_ok=True)
+        made_dirs.add(page_dir)
+    try:
+        os.mkdir(dest_dir)
+    except FileExistsError:
+        pass
+    _copy_file(source_path, dest_path, src_st)
+
 def clean_xhtml_content(xhtml_content):
     """
     Simplifies XHTML tags found in Confluence storage format,
@@ -22,217 +141,426 @@ def clean_xhtml_content(xhtml_content):
     """
     if xhtml_content is None:
         return ""
-    text_content = re.sub(r'<[^>]+>', '', xhtml_content)
-    return html.unescape(text_content).strip()
+    # Bodies without any markup skip the regex scan entirely
+    if '<' in xhtml_content:
+        xhtml_content = _TAG_RE.sub('', xhtml_content)
+    return html.unescape(xhtml_content).strip()
+
+def _iter_objects(xml_file_path, class_counts=None):
+    """
+    Streams the top-level <object> elements of a Confluence XML export.
+    Each element is cleared once the caller has processed it, so memory use
+    stays flat regardless of the size of the export.
+    If class_counts is given, every <object> with a class attribute is counted
+    in it by class, including nested ones that are not yielded.
+    """
+    with open(xml_file_path, 'rb') as f:
+        # The export is read front to back, so ask the kernel for aggressive read-ahead
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass  # Only a hint; e.g. pipes reject it with ESPIPE
+        for _, elem in etree.iterparse(f, events=('end',), tag='object', recover=True, huge_tree=True):
+            if class_counts is not None:
+                class_attr = elem.get('class')
+                if class_attr:
+                    class_counts[class_attr] += 1
+            parent = elem.getparent()
+            if parent is None or parent.getparent() is not None:
+                # Nested object (e.g. a Labelling inside a page); handled with its owner.
+                continue
+            yield elem
+            elem.clear()
+            while elem.getprevious() is not None:
+                del parent[0]
+
+@dataclass(slots=True)
+class Attachment:
+    """
+    An attachment of a content entry. Slots keep the per-instance footprint
+    small, since large exports can contain millions of attachments.
+    """
+    id: str
+    filename: str
+    filesize: int
+    content_type: str
+    author: Optional[str]
+    created_at: str
+    filepath: Optional[str] = None  # Set to the restored file path once the copy succeeds
+
+# First-pass handlers. Each extracts one object's fields with a single scan
+# over its direct children and stores them in the matching lookup map.
+def _map_user(obj, maps):
+    user_key = user_name = None
+    for child in obj.iterchildren('id', 'property'):
+        child_name = child.get('name')
+        if child.tag == 'id':
+            if child_name == 'key':
+                user_key = child.text
+        elif child_name in ('fullName', 'name'):
+            # Whichever of the two comes first in the document wins
+            if user_name is None:
+                user_name = child.text
+    if user_key and user_name:
+        maps['users'][user_key] = user_name
+
+def _map_body_content(obj, maps):
+    content_id = body = None
+    for child in obj.iterchildren('id', 'property'):
+        child_name = child.get('name')
+        if child.tag == 'id':
+            if child_name == 'id':
+                content_id = child.text
+        elif child_name == 'body':
+            body = child.text
+    if content_id and body is not None:
+        maps['body_contents'][content_id] = body
+
+def _map_label(obj, maps):
+    label_id = label_name = None
+    for child in obj.iterchildren('id', 'property'):
+        if child.tag == 'id':
+            if label_id is None:
+                label_id = child.text
+        elif child.get('name') == 'name':
+            label_name = child.text
+    if label_id and label_name:
+        maps['labels'][label_id] = label_name
+
+def _map_content_property(obj, maps):
+    prop_id = prop_name = prop_value = None
+    for child in obj.iterchildren('id', 'property'):
+        child_name = child.get('name')
+        if child.tag == 'id':
+            if child_name == 'id':
+                prop_id = child.text
+        elif child_name == 'name':
+            prop_name = child.text
+        elif child_name in ('stringValue', 'longValue'):
+            # Whichever of the two comes first in the document wins
+            if prop_value is None:
+                prop_value = child.text
+    if prop_id and prop_value:
+        # Attachments only ever read these two properties, so they are kept
+        # in flat maps keyed by property ID and everything else is dropped.
+        if prop_name == 'FILESIZE':
+            maps['filesizes'][prop_id] = int(prop_value)
+        elif prop_name == 'MEDIA_TYPE':
+            maps['media_types'][prop_id] = prop_value
+
+_HANDLERS = {
+    'ConfluenceUserImpl': _map_user,
+    'BodyContent': _map_body_content,
+    'Label': _map_label,
+    'ContentProperty': _map_content_property,
+}
+
+def _spool_to_temp_file(xml_file_path):
+    """
+    Copies a non-seekable input (e.g. a pipe or /dev/stdin) to a temporary
+    file and returns its path. The caller is responsible for removing it.
+    """
+    with open(xml_file_path, 'rb') as src, \
+            tempfile.NamedTemporaryFile(suffix='.xml', delete=False) as dst:
+        try:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        except BaseException:
+            dst.close()
+            os.remove(dst.name)
+            raise
+    return dst.name
 
 def parse_confluence_xml(xml_file_path, attachments_base_dir=None, restore_dir=None, debug=False):
     """
     Parses a Confluence XML export file using lxml.
     It also includes functionality to restore attachments to a specified directory.
+    The file is streamed twice: the first pass builds the lookup maps and the
+    second pass resolves attachments and content against them. Input that is
+    not a regular file (e.g. a pipe) can only be read once, so it is first
+    spooled to a temporary file.
+    This is a generator; content entries are yielded one at a time once both
+    passes are done, and nothing is yielded if the file cannot be parsed.
+    debug=True lowers this module's logger to DEBUG; progress is reported through logging.
     """
-    print(f"Parsing '{xml_file_path}'...")
+    if debug:
+        log.setLevel(logging.DEBUG)
+    log.info("Parsing '%s'...", xml_file_path)
     if not os.path.exists(xml_file_path):
-        print(f"Error: Input file '{xml_file_path}' not found.")
-        return None
-        
+        log.error("Error: Input file '%s' not found.", xml_file_path)
+        return
+
+    spooled_path = None
+    if not os.path.isfile(xml_file_path):
+        log.info("Input is not a regular file; copying it to a temporary file first...")
+        try:
+            spooled_path = _spool_to_temp_file(xml_file_path)
+        except OSError as e:
+            log.error("Error: Failed to read input '%s': %s", xml_file_path, e)
+            return
     try:
-        with open(xml_file_path, 'rb') as f:
-            xml_bytes = f.read()
-        parser = etree.XMLParser(recover=True, huge_tree=True)
-        root = etree.fromstring(xml_bytes, parser=parser)
+        yield from _parse_export(spooled_path or xml_file_path, attachments_base_dir, restore_dir)
+    finally:
+        if spooled_path is not None:
+            os.remove(spooled_path)
+
+def _parse_export(xml_file_path, attachments_base_dir, restore_dir):
+    """
+    Runs both passes over a regular, re-readable export file for parse_confluence_xml.
+    """
+    # --- Step 1 / Step 2: Classify objects and pre-map related information (first pass) ---
+    class_counts = defaultdict(int)
+    maps = {'users': {}, 'body_contents': {}, 'labels': {}, 'filesizes': {}, 'media_types': {}}
+    # Logged when the first object of the class is handled
+    debug_banners = {
+        'ConfluenceUserImpl': "--- Debug: Starting parsing of user information (ConfluenceUserImpl) ---",
+        'ContentProperty': "--- Debug: Starting parsing of content properties (ContentProperty) ---",
+    }
+    try:
+        for obj in _iter_objects(xml_file_path, class_counts):
+            class_attr = obj.get('class')
+            if not class_attr:
+                continue
+
+            if class_attr in debug_banners:
+                log.debug(debug_banners.pop(class_attr))
+            handler = _HANDLERS.get(class_attr)
+            if handler:
+                handler(obj, maps)
     except Exception as e:
-        print(f"Error: Failed to parse XML file: {e}")
-        return None
-
-    # --- Step 1: Classify all objects by class ---
-    objects_by_class = defaultdict(list)
-    for obj in root.iter('object'):
-        class_attr = obj.get('class')
-        if class_attr:
-            objects_by_class[class_attr].append(obj)
-    
-    print("--- Step 1: Classification results of all objects ---")
-    for cls, items in sorted(objects_by_class.items()):
-        print(f"  - {cls}: {len(items)} items")
-    print("-" * 20)
-
-    # --- Step 2: Pre-map related information ---
-    users_map = {}
-    if debug: print("--- Debug: Starting parsing of user information (ConfluenceUserImpl) ---")
-    for i, obj in enumerate(objects_by_class.get('ConfluenceUserImpl', [])):
-        user_key_node = obj.xpath("./id[@name='key']/text()")
-        user_name_node = obj.xpath("./property[@name='fullName']/text() | ./property[@name='name']/text()")
-        if user_key_node and user_name_node:
-            users_map[user_key_node[0]] = user_name_node[0]
-    print(f"Step 2.1: Loaded {len(users_map)} user information entries.")
-
-    body_content_map = {}
-    for obj in objects_by_class.get('BodyContent', []):
-        content_id_node = obj.xpath("./id[@name='id']/text()")
-        body_node = obj.xpath("./property[@name='body']")
-        if content_id_node and body_node and body_node[0].text is not None:
-            body_content_map[content_id_node[0]] = body_node[0].text
-    print(f"Step 2.2: Loaded {len(body_content_map)} body content entries.")
-    
-    labels_map = {}
-    for obj in objects_by_class.get('Label', []):
-        label_id_node = obj.xpath("./id/text()")
-        label_name_node = obj.xpath("./property[@name='name']/text()")
-        if label_id_node and label_name_node:
-            labels_map[label_id_node[0]] = label_name_node[0]
-    print(f"Step 2.3: Loaded {len(labels_map)} label definitions.")
-
-    # --- Step 3: Pre-map content properties ---
-    content_properties_map = {}
-    if debug: print("--- Debug: Starting parsing of content properties (ContentProperty) ---")
-    for i, obj in enumerate(objects_by_class.get('ContentProperty', [])):
-        prop_id_node = obj.xpath("./id[@name='id']/text()")
-        prop_name_node = obj.xpath("./property[@name='name']/text()")
-        prop_value_node = obj.xpath("./property[@name='stringValue']/text() | ./property[@name='longValue']/text()")
-        if prop_id_node and prop_name_node and prop_value_node:
-            content_properties_map[prop_id_node[0]] = {
-                "name": prop_name_node[0],
-                "value": prop_value_node[0]
-            }
-    print(f"Step 2.4: Loaded {len(content_properties_map)} content properties.")
-
-
-    # --- Step 4: Group related information by page ID ---
+        log.error("Error: Failed to parse XML file: %s", e)
+        return
+
+    users_map = maps['users']
+    body_content_map = maps['body_contents']
+    labels_map = maps['labels']
+    filesizes_map = maps['filesizes']
+    media_types_map = maps['media_types']
+
+    log.info("--- Step 1: Classification results of all objects ---")
+    for cls, count in sorted(class_counts.items()):
+        log.info("  - %s: %d items", cls, count)
+    log.info("-" * 20)
+
+    log.info("Step 2.1: Loaded %d user information entries.", len(users_map))
+    log.info("Step 2.2: Loaded %d body content entries.", len(body_content_map))
+    log.info("Step 2.3: Loaded %d label definitions.", len(labels_map))
+    log.info("Step 2.4: Loaded %d file sizes and %d media types from content properties.",
+             len(filesizes_map), len(media_types_map))
+
+    # --- Step 3 / Step 4: Group attachments by page ID and assemble content (second pass) ---
     attachments_by_page = defaultdict(list)
     restored_count = 0
-    if debug: print("--- Debug: Starting parsing of attachments (Attachment) ---")
-    for i, obj in enumerate(objects_by_class.get('Attachment', [])):
-        page_id_node = obj.xpath(".//property[@name='content' or @name='container' or @name='containerContent']//id[@name='id']/text()")
-        attachment_id_node = obj.xpath("./id[@name='id']/text()")
-
-        if not page_id_node or not attachment_id_node:
-            if debug: print("    - -> Skipping: Page ID or attachment ID not found.")
-            continue
-        page_id = page_id_node[0]
-        attachment_id = attachment_id_node[0]
-        
-        creator_key_node = obj.xpath(".//property[@name='creator']/id[@name='key']/text()")
-        
-        attachment_props = {}
-        prop_id_nodes = obj.xpath(".//collection[@name='contentProperties']/element/id[@name='id']/text()")
-        for prop_id in prop_id_nodes:
-            if prop_id in content_properties_map:
-                prop = content_properties_map[prop_id]
-                attachment_props[prop['name']] = prop['value']
-        
-        filename = (obj.xpath("./property[@name='title']/text()") or [''])[0]
-        filesize = int(attachment_props.get('FILESIZE', 0))
-        content_type = attachment_props.get('MEDIA_TYPE', '')
-        
-        # --- Start of modified/added logic ---
-        # Restore attachment and record its path
-        restored_file_path = None
-        if attachments_base_dir and restore_dir and filename:
-            source_path = os.path.join(attachments_base_dir, page_id, attachment_id, '1')
-            
-            if os.path.exists(source_path):
-                # Output directory structure: {restore_dir}/{page_id}/{attachment_id}/{original_filename}
-                dest_dir = os.path.join(restore_dir, page_id, attachment_id)
-                dest_path = os.path.join(dest_dir, filename)
-                
+    # (attachment, source path, source stat, destination dir, destination path) for each attachment to restore
+    restore_work = []
+    restore_enabled = bool(attachments_base_dir and restore_dir)
+    if restore_enabled:
+        # Paths are built with f-strings from these bases; os.path.join is comparatively slow per attachment
+        src_base = attachments_base_dir.rstrip(os.sep) + os.sep
+        dst_base = restore_dir.rstrip(os.sep) + os.sep
+    comments_by_page = defaultdict(list)
+    # (Comment logic remains unchanged)
+
+    content_types = ['Page', 'Blogpost', 'CustomContentEntityObject']
+    content_by_type = {content_type: [] for content_type in content_types}
+    # Entries whose content_text still has to be derived from content_raw
+    pending_clean = []
+    # Bound once; these are probed for every attachment property and page label
+    get_filesize = filesizes_map.get
+    get_media_type = media_types_map.get
+    get_label = labels_map.get
+    log.debug("--- Debug: Starting parsing of attachments (Attachment) ---")
+    try:
+        for obj in _iter_objects(xml_file_path):
+            class_attr = obj.get('class')
+
+            if class_attr == 'Attachment':
+                page_id_node = _XP_ATTACH_PAGE(obj)
+                attachment_id = _first_child_id(obj, 'id')
+
+                if not page_id_node or not attachment_id:
+                    log.debug("    - -> Skipping: Page ID or attachment ID not found.")
+                    continue
+                page_id = page_id_node[0]
+
+                creator_key_node = _XP_ATTACH_CREATOR(obj)
+
+                filesize = 0
+                content_type = ''
+                for prop_id in _XP_ATTACH_PROPS(obj):
+                    # A property is either a FILESIZE or a MEDIA_TYPE, so a size hit needs no second probe
+                    size = get_filesize(prop_id)
+                    if size is not None:
+                        filesize = size
+                    else:
+                        content_type = get_media_type(prop_id, content_type)
+
+                filename = _prop_text(obj, 'title') or ''
+
+                attachment = Attachment(
+                    id=attachment_id,
+                    filename=filename,
+                    filesize=filesize,
+                    content_type=content_type,
+                    author=users_map.get(creator_key_node[0]) if creator_key_node else None,
+                    created_at=_prop_text(obj, 'creationDate') or '',
+                )
+                attachments_by_page[page_id].append(attachment)
+
+                # Queue the attachment for restoration; copies run in parallel after this pass
+                if restore_enabled and filename:
+                    source_path = f"{src_base}{page_id}{os.sep}{attachment_id}{os.sep}1"
+
+                    try:
+                        src_st = os.stat(source_path)
+                    except OSError:
+                        log.debug("    - -> Warning: Attachment source not found: %s", source_path)
+                    else:
+                        # Output directory structure: {restore_dir}/{page_id}/{attachment_id}/{original_filename}
+                        dest_dir = f"{dst_base}{page_id}{os.sep}{attachment_id}"
+                        dest_path = f"{dest_dir}{os.sep}{filename}"
+                        restore_work.append((attachment, source_path, src_st, dest_dir, dest_path))
+
+            elif class_attr in content_by_type:
+                page_id = _first_child_id(obj, 'id')
+                if not page_id: continue
+
+                creator_key_node = _XP_CREATOR(obj)
+                modifier_key_node = _XP_MODIFIER(obj)
+
+                title = _prop_text(obj, 'title')
+                if not title: continue
+
+                page_info = {
+                    'id': page_id,
+                    'type': class_attr,
+                    'title': title,
+                    'creator': users_map.get(creator_key_node[0]) if creator_key_node else None,
+                    'last_modifier': users_map.get(modifier_key_node[0]) if modifier_key_node else None,
+                    'attachments': None,  # Filled in once all attachments have been grouped
+                    'comments': comments_by_page.get(page_id, []),
+                    'labels': [],
+                }
+
+                version = _prop_text(obj, 'version')
+                page_info['version'] = int(version) if version else 0
+
+                page_info['created_at'] = _prop_text(obj, 'creationDate') or None
+
+                page_info['modified_at'] = _prop_text(obj, 'lastModificationDate') or None
+
+                body_content_ref_node = _XP_BODY_REF(obj)
+                if body_content_ref_node and body_content_ref_node[0] in body_content_map:
+                    raw_content = body_content_map[body_content_ref_node[0]]
+                    page_info['content_raw'] = raw_content
+                    page_info['content_text'] = None  # Cleaned in parallel after this pass
+                    pending_clean.append(page_info)
+                else:
+                    page_info['content_raw'] = None
+                    page_info['content_text'] = ""
+
+                parent_ref_node = _XP_PARENT(obj)
+                if parent_ref_node:
+                    page_info['parent_id'] = parent_ref_node[0]
+
+                labels = page_info['labels']
+                for label_ref_node in _XP_LABELLINGS(obj):
+                    label_name = get_label(label_ref_node)
+                    if label_name is not None:
+                        labels.append(label_name)
+
+                content_by_type[class_attr].append(page_info)
+    except Exception as e:
+        log.error("Error: Failed to parse XML file: %s", e)
+        return
+
+    if restore_work:
+        made_dirs = set()
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (attachment, source_path, dest_path,
+                 executor.submit(_restore_attachment, source_path, src_st, dest_dir, dest_path, made_dirs))
+                for attachment, source_path, src_st, dest_dir, dest_path in restore_work
+            ]
+            for attachment, source_path, dest_path, future in futures:
                 try:
-                    os.makedirs(dest_dir, exist_ok=True)
-                    shutil.copy2(source_path, dest_path)
-                    restored_file_path = dest_path
-                    restored_count += 1
-                    if debug:
-                        print(f"    - -> Restore successful: '{source_path}' -> '{dest_path}'")
+                    future.result()
                 except Exception as e:
-                    print(f"    - -> Error: Failed to restore file: {e}")
-            elif debug:
-                print(f"    - -> Warning: Attachment source not found: {source_path}")
-        # --- End of modified/added logic ---
-
-        attachments_by_page[page_id].append({
-            'id': attachment_id,
-            'filename': filename,
-            'filesize': filesize,
-            'content_type': content_type,
-            'author': users_map.get(creator_key_node[0]) if creator_key_node else None,
-            'created_at': (obj.xpath("./property[@name='creationDate']/text()") or [''])[0],
-            'filepath': restored_file_path  # Add restored file path
-        })
-    print(f"Step 3.1: Grouped {len(attachments_by_page)} attachments linked to pages.")
+                    log.error("    - -> Error: Failed to restore file: %s", e)
+                    continue
+                attachment.filepath = dest_path
+                restored_count += 1
+                log.debug("    - -> Restore successful: '%s' -> '%s'", source_path, dest_path)
+
+    log.info("Step 3.1: Grouped %d attachments linked to pages.", len(attachments_by_page))
     if restore_dir:
-        print(f"Step 3.1.1: Restored {restored_count} attachments to '{restore_dir}'.")
+        log.info("Step 3.1.1: Restored %d attachments to '%s'.", restored_count, restore_dir)
+    log.info("Step 3.2: Grouped %d comments linked to pages.", len(comments_by_page))
 
-    comments_by_page = defaultdict(list)
-    # (Comment logic remains unchanged)
-    print(f"Step 3.2: Grouped {len(comments_by_page)} comments linked to pages.")
+    if pending_clean:
+        raw_contents = [page_info['content_raw'] for page_info in pending_clean]
+        if len(raw_contents) > _CLEAN_CHUNK_SIZE:
+            # No more workers than there are chunks to hand out
+            max_workers = min(os.cpu_count() or 1, -(-len(raw_contents) // _CLEAN_CHUNK_SIZE))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                texts = list(executor.map(clean_xhtml_content, raw_contents, chunksize=_CLEAN_CHUNK_SIZE))
+        else:
+            texts = [clean_xhtml_content(raw_content) for raw_content in raw_contents]
+        for page_info, text in zip(pending_clean, texts):
+            page_info['content_text'] = text
 
     # --- Step 5: Assemble all information ---
-    content_data = []
-    content_types = ['Page', 'Blogpost', 'CustomContentEntityObject']
+    assembled_count = 0
     for content_type in content_types:
-        for obj in objects_by_class.get(content_type, []):
-            page_id_node = obj.xpath("./id[@name='id']/text()")
-            if not page_id_node: continue
-            page_id = page_id_node[0]
-
-            creator_key_node = obj.xpath("./property[@name='creator']/id[@name='key']/text()")
-            modifier_key_node = obj.xpath("./property[@name='lastModifier']/id[@name='key']/text()")
-            
-            title_node = obj.xpath("./property[@name='title']/text()")
-            if not title_node: continue 
-
-            page_info = {
-                'id': page_id,
-                'type': content_type,
-                'title': title_node[0],
-                'creator': users_map.get(creator_key_node[0]) if creator_key_node else None,
-                'last_modifier': users_map.get(modifier_key_node[0]) if modifier_key_node else None,
-                'attachments': attachments_by_page.get(page_id, []),
-                'comments': comments_by_page.get(page_id, []),
-                'labels': [],
-            }
-
-            version_node = obj.xpath("./property[@name='version']/text()")
-            page_info['version'] = int(version_node[0]) if version_node else 0
-            
-            creation_date_node = obj.xpath("./property[@name='creationDate']/text()")
-            page_info['created_at'] = creation_date_node[0] if creation_date_node else None
-
-            mod_date_node = obj.xpath("./property[@name='lastModificationDate']/text()")
-            page_info['modified_at'] = mod_date_node[0] if mod_date_node else None
-
-            body_content_ref_node = obj.xpath(".//collection[@name='bodyContents']/element/id[@name='id']/text()")
-            if body_content_ref_node and body_content_ref_node[0] in body_content_map:
-                raw_content = body_content_map[body_content_ref_node[0]]
-                page_info['content_raw'] = raw_content
-                page_info['content_text'] = clean_xhtml_content(raw_content)
-            else:
-                page_info['content_raw'] = None
-                page_info['content_text'] = ""
-
-            parent_ref_node = obj.xpath(".//collection[@name='parent']/ref/id[@name='id']/text()")
-            if parent_ref_node:
-                page_info['parent_id'] = parent_ref_node[0]
-
-            for label_ref_node in obj.xpath(".//collection[@name='labellings']/object/ref[@name='label']/id/text()"):
-                if label_ref_node in labels_map:
-                    page_info['labels'].append(labels_map[label_ref_node])
-
-            content_data.append(page_info)
-
-    print(f"Step 4: Assembled {len(content_data)} content entries.")
-    return content_data
+        for page_info in content_by_type.pop(content_type):
+            page_info['attachments'] = attachments_by_page.get(page_info['id'], [])
+            assembled_count += 1
+            yield page_info
+
+    log.info("Step 4: Assembled %d content entries.", assembled_count)
+
+def _json_default(obj):
+    """
+    Serializes dataclass instances (e.g. Attachment) for the standard json module.
+    """
+    if is_dataclass(obj):
+        return asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _encode_json(record):
+    """
+    Encodes a single record as 2-space indented UTF-8 JSON bytes,
+    using orjson when it is installed and the standard json module otherwise.
+    Both serialize dataclasses such as Attachment as plain JSON objects.
+    """
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(record, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
 
 def save_as_json(data, output_file_path):
-    if not data:
-        print("No content found for processing, so no file was output.")
+    """
+    Writes content entries to a JSON array file, encoding one entry at a time.
+    data may be any iterable, such as the generator returned by
+    parse_confluence_xml; the file is only created if there is at least one entry.
+    """
+    records = iter(data)
+    first_record = next(records, None)
+    if first_record is None:
+        log.info("No content found for processing, so no file was output.")
         return
-    print(f"Saving data to '{output_file_path}'...")
+    log.info("Saving data to '%s'...", output_file_path)
     try:
-        with open(output_file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        print("JSON file saved successfully.")
+        with open(output_file_path, 'wb') as f:
+            f.write(b'[\n')
+            f.write(_encode_json(first_record))
+            for record in records:
+                f.write(b',\n')
+                f.write(_encode_json(record))
+            f.write(b'\n]\n')
+        log.info("JSON file saved successfully.")
     except IOError as e:
-        print(f"Error: Failed to write file: {e}")
+        log.error("Error: Failed to write file: %s", e)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Converts a Confluence XML export to JSON and restores attachments.')
@@ -246,6 +574,8 @@ if __name__ == '__main__':
     parser.add_argument('--debug', action='store_true', help='Enables debug information')
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
     
     if args.restore_dir and not args.attachments_dir:
         parser.error("'--restore-dir' requires '--attachments-dir' to be specified as well.")
@@ -256,5 +586,4 @@ if __name__ == '__main__':
         restore_dir=args.restore_dir,
         debug=args.debug
     )
-    if pages is not None:
-        save_as_json(pages, args.output)
+    save_as_json(pages, args.output)